@@ -11,29 +11,48 @@ Uses Groq API (free tier) to fix common Whisper errors in Hinglish:
 Usage:
     python enhance_captions.py captions.json --output enhanced_captions.json
     python enhance_captions.py captions.json --groq-key YOUR_KEY --output enhanced_captions.json
+    python enhance_captions.py captions.json --groq-model balanced --output enhanced_captions.json
 """
 
 import argparse
-import json
+import hashlib
+import math
 import os
 import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
 
-def enhance_with_groq(captions_data: dict, api_key: str) -> dict:
-    """Use Groq to fix Whisper Hinglish transcription errors."""
-    
-    try:
-        import requests
-    except ImportError:
-        print("⚠️  requests not installed, skipping AI enhancement")
-        return captions_data
-    
-    # Extract just the text for correction
-    words = [c["text"] for c in captions_data["captions"]]
-    full_text = " ".join(words)
-    
-    prompt = f"""You are a Hinglish text corrector. Fix spelling and transliteration errors in this Whisper-transcribed Hinglish text.
+from jsonio import dumps, loads, write_json
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+except ImportError:
+    requests = None
+
+GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+# Words per Groq request. Windows are corrected concurrently, so long
+# transcripts cost roughly one request's latency instead of one per window.
+WINDOW_SIZE = 200
+MAX_CONCURRENT_REQUESTS = 8
+
+# Words of context sent on each side of a low-confidence word
+CONTEXT_WORDS = 5
+
+# Spelling/transliteration fixes don't need a large model; the 8B instant
+# tier has much lower time-to-first-token.
+SPEED_MAP = {
+    "instant": "llama-3.1-8b-instant",
+    "balanced": "llama-3.3-70b-versatile",
+}
+DEFAULT_MODEL = SPEED_MAP["instant"]
+
+PROMPT_TEMPLATE = """You are a Hinglish text corrector. Fix spelling and transliteration errors in this Whisper-transcribed Hinglish text.
 
 Rules:
 - Keep words in Roman script (no Devanagari)
@@ -41,65 +60,238 @@ Rules:
 - Maintain the EXACT number of words — do NOT add or remove words
 - Return ONLY the corrected text, nothing else
 
-Original: {full_text}
+Original: {text}
 
 Corrected:"""
 
+# Bump whenever PROMPT_TEMPLATE changes so cached corrections are not reused.
+PROMPT_VERSION = 1
+DEFAULT_CACHE_DIR = ".cache/groq"
+
+
+def _build_session():
+    """Shared keep-alive session so every window reuses pooled TLS connections."""
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({"POST"}),
+    )
+    session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry))
+    return session
+
+
+_SESSION = _build_session() if requests is not None else None
+
+
+def _cache_key(text: str, model: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{model}\0{PROMPT_VERSION}\0".encode("utf-8"))
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _cached_call(cache_dir, key: str, fn, valid=lambda result: result is not None):
+    """Return the cached result for key, or call fn and cache a valid result.
+
+    Cache I/O errors are not fatal; the call just goes uncached.
+    """
+    if cache_dir is None:
+        return fn()
+
+    cache_path = Path(cache_dir) / f"{key}.json"
+    try:
+        if cache_path.exists():
+            return loads(cache_path.read_bytes())
+    except (OSError, ValueError):
+        pass
+
+    result = fn()
+    if valid(result):
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # Unique temp file per writer, so identical windows in one run can't collide
+            with tempfile.NamedTemporaryFile(dir=cache_path.parent, suffix=".tmp", delete=False) as tmp:
+                tmp.write(dumps(result))
+            os.replace(tmp.name, cache_path)
+        except OSError:
+            pass
+    return result
+
+
+def _fix_window(api_key: str, words: list, model: str = DEFAULT_MODEL, cache_dir=None) -> list:
+    """Correct one window of words, using the on-disk cache when enabled.
+
+    Only replies with one word per input word are cached.
+    """
+    text = " ".join(words)
+    return _cached_call(
+        cache_dir,
+        _cache_key(text, model),
+        lambda: _request_correction(api_key, text, model),
+        valid=lambda result: result is not None and len(result) == len(words),
+    )
+
+
+def _request_correction(api_key: str, text: str, model: str) -> list:
+    """Send one correction request to Groq. Returns None on failure."""
     try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
+        response = _SESSION.post(
+            GROQ_API_URL,
             headers={
                 "Authorization": f"Bearer {api_key}",
                 "Content-Type": "application/json",
             },
             json={
-                "model": "llama-3.3-70b-versatile",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.1,
-                "max_tokens": len(full_text) * 2,
+                "model": model,
+                "messages": [{"role": "user", "content": PROMPT_TEMPLATE.format(text=text)}],
+                "temperature": 0,
+                "max_tokens": math.ceil(len(text) / 3) + 32,
+                "service_tier": "auto",
+                "stream": True,
             },
             timeout=30,
+            stream=True,
         )
-        
-        if response.status_code == 200:
-            corrected = response.json()["choices"][0]["message"]["content"].strip()
-            corrected_words = corrected.split()
-            
-            # Only apply if word count matches (safety check)
-            if len(corrected_words) == len(captions_data["captions"]):
-                for i, caption in enumerate(captions_data["captions"]):
-                    if caption["text"] != corrected_words[i]:
-                        caption["original"] = caption["text"]
-                        caption["text"] = corrected_words[i]
-                        caption["enhanced"] = True
-                
-                enhanced_count = sum(1 for c in captions_data["captions"] if c.get("enhanced"))
-                print(f"✨ Enhanced {enhanced_count} words via Groq AI")
-            else:
-                print(f"⚠️  Word count mismatch ({len(corrected_words)} vs {len(captions_data['captions'])}), skipping AI fixes")
-        else:
-            print(f"⚠️  Groq API error: {response.status_code}")
-    
+
+        with response:
+            if response.status_code != 200:
+                print(f"⚠️  Groq API error: {response.status_code}")
+                return None
+            return _read_stream(response)
+
     except Exception as e:
         print(f"⚠️  AI enhancement failed: {e}")
+        return None
+
+
+def _read_stream(response) -> list:
+    """Collect corrected words from a Groq SSE stream as they complete."""
+    words = []
+    pending = ""
+    for line in response.iter_lines():
+        if not line.startswith(b"data: "):
+            continue
+        data = line[len(b"data: "):]
+        if data == b"[DONE]":
+            break
+
+        pending += loads(data)["choices"][0]["delta"].get("content") or ""
+        parts = pending.split()
+        # The last word may continue in the next chunk unless whitespace follows it
+        pending = parts.pop() if parts and not pending[-1].isspace() else ""
+        words.extend(parts)
+
+    if pending:
+        words.append(pending)
+    return words
+
+
+def _low_confidence_windows(captions: list, window_size: int, context: int = CONTEXT_WORDS) -> list:
+    """Group words flagged lowConfidence, with context, into non-overlapping windows."""
+    ranges = []
+    for i, caption in enumerate(captions):
+        if not caption.get("lowConfidence"):
+            continue
+        start, end = max(0, i - context), min(len(captions), i + context + 1)
+        if ranges and start <= ranges[-1][1] and end - ranges[-1][0] <= window_size:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            if ranges:
+                start = max(start, ranges[-1][1])
+            ranges.append((start, end))
+    return [captions[start:end] for start, end in ranges]
+
+
+def enhance_with_groq(
+    captions_data: dict,
+    api_key: str,
+    model: str = DEFAULT_MODEL,
+    window_size: int = WINDOW_SIZE,
+    cache_dir=None,
+    selective: bool = True,
+) -> dict:
+    """Use Groq to fix Whisper Hinglish transcription errors.
+
+    With selective=True and real per-word confidences, only the words flagged
+    by flag_low_confidence (plus a few words of context) are sent; otherwise
+    the whole transcript is split into fixed-size windows. Windows are
+    corrected concurrently and checked independently, so a failed or
+    misaligned window only discards its own slice. When cache_dir is set,
+    corrections are cached per window so unchanged windows skip the API.
+    """
+    
+    if requests is None:
+        print("⚠️  requests not installed, skipping AI enhancement")
+        return captions_data
+    
+    captions = captions_data["captions"]
+    # Only go selective when the producer says the per-word scores are real;
+    # older transcripts have a placeholder confidence and no such flag
+    if selective and captions_data.get("word_confidence", False):
+        windows = _low_confidence_windows(captions, window_size)
+        if not windows:
+            print("✅ No low-confidence words, skipping AI enhancement")
+            return captions_data
+        sent = sum(len(w) for w in windows)
+        print(f"🎯 Sending {sent}/{len(captions)} words around low-confidence spots to Groq")
+    else:
+        windows = [captions[i:i + window_size] for i in range(0, len(captions), window_size)]
+    if not windows:
+        return captions_data
+
+    workers = min(MAX_CONCURRENT_REQUESTS, len(windows))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(
+            lambda window: _fix_window(api_key, [c["text"] for c in window], model, cache_dir),
+            windows,
+        ))
+
+    for index, (window, corrected_words) in enumerate(zip(windows, results)):
+        if corrected_words is None:
+            continue
+        
+        # Only apply if word count matches (safety check)
+        if len(corrected_words) != len(window):
+            print(f"⚠️  Word count mismatch in window {index + 1}/{len(windows)} "
+                  f"({len(corrected_words)} vs {len(window)}), skipping AI fixes")
+            continue
+
+        for caption, word in zip(window, corrected_words):
+            if caption["text"] != word:
+                caption["original"] = caption["text"]
+                caption["text"] = word
+                caption["enhanced"] = True
+    
+    enhanced_count = sum(1 for c in captions if c.get("enhanced"))
+    print(f"✨ Enhanced {enhanced_count} words via Groq AI ({model}, {len(windows)} windows)")
     
     return captions_data
 
 
 def flag_low_confidence(captions_data: dict, threshold: float = 0.7) -> dict:
     """Flag words with low Whisper confidence for manual review."""
-    flagged = []
-    for caption in captions_data["captions"]:
-        if caption["confidence"] < threshold:
-            caption["lowConfidence"] = True
-            flagged.append(f"  ⚠️  '{caption['text']}' (confidence: {caption['confidence']:.0%})")
+    captions = captions_data["captions"]
+    confidence = np.fromiter(
+        (c["confidence"] for c in captions), dtype=np.float32, count=len(captions)
+    )
+
+    # Compare in float32 so a confidence equal to the threshold isn't flagged
+    flagged = np.flatnonzero(confidence < np.float32(threshold))
+    for i in flagged:
+        captions[i]["lowConfidence"] = True
     
-    if flagged:
-        print(f"\n🔍 {len(flagged)} low-confidence words flagged:")
-        for f in flagged[:10]:
-            print(f)
+    if len(flagged):
+        # Only the first 10 are shown, so only those get formatted
+        lines = [f"\n🔍 {len(flagged)} low-confidence words flagged:"]
+        lines.extend(
+            "  ⚠️  '%s' (confidence: %.0f%%)" % (captions[i]["text"], captions[i]["confidence"] * 100)
+            for i in flagged[:10]
+        )
         if len(flagged) > 10:
-            print(f"  ... and {len(flagged) - 10} more")
+            lines.append(f"  ... and {len(flagged) - 10} more")
+        sys.stdout.write("\n".join(lines) + "\n")
     
     return captions_data
 
@@ -110,6 +302,18 @@ def main():
     parser.add_argument("--output", "-o", default=None, help="Output file (default: overwrite input)")
     parser.add_argument("--groq-key", default=None, help="Groq API key (or set GROQ_API_KEY env)")
     parser.add_argument("--confidence-threshold", type=float, default=0.7, help="Low confidence threshold")
+    parser.add_argument(
+        "--groq-model",
+        default="instant",
+        help=f"Groq model name or preset ({', '.join(SPEED_MAP)}; default: instant)",
+    )
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"Groq response cache (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true", help="Always call Groq, ignoring cached corrections")
+    parser.add_argument(
+        "--enhance-all",
+        action="store_true",
+        help="Send the whole transcript to Groq, not just low-confidence words",
+    )
     
     args = parser.parse_args()
     
@@ -118,7 +322,7 @@ def main():
         print(f"❌ File not found: {args.input}")
         sys.exit(1)
     
-    captions_data = json.loads(input_path.read_text(encoding="utf-8"))
+    captions_data = loads(input_path.read_bytes())
     
     # Step 1: Flag low confidence words
     captions_data = flag_low_confidence(captions_data, args.confidence_threshold)
@@ -126,16 +330,21 @@ def main():
     # Step 2: AI enhancement (if API key available)
     api_key = args.groq_key or os.environ.get("GROQ_API_KEY", "")
     if api_key:
-        captions_data = enhance_with_groq(captions_data, api_key)
+        model = SPEED_MAP.get(args.groq_model, args.groq_model)
+        cache_dir = None if args.no_cache else args.cache_dir
+        captions_data = enhance_with_groq(
+            captions_data,
+            api_key,
+            model,
+            cache_dir=cache_dir,
+            selective=not args.enhance_all,
+        )
     else:
         print("ℹ️  No Groq API key provided, skipping AI enhancement")
     
     # Write output
     output_path = args.output or args.input
-    Path(output_path).write_text(
-        json.dumps(captions_data, indent=2, ensure_ascii=False),
-        encoding="utf-8"
-    )
+    write_json(output_path, captions_data)
     print(f"\n💾 Saved to: {output_path}")
 
 
@@ -0,0 +1,68 @@
+"""
+jsonio.py — JSON helpers shared by the caption scripts.
+
+Uses orjson when it is installed and falls back to the stdlib json module.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj, indent: bool = True) -> bytes:
+    """Serialize to UTF-8 JSON, using orjson when it is installed."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def write_json(path, obj: dict):
+    """Write a captions document, serializing the captions one record at a time.
+
+    The full document is never built as one string; each caption goes on its
+    own line. It is streamed to a temporary file beside path and renamed
+    into place, so an in-place rewrite never leaves a truncated file.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=parent, suffix=".tmp", delete=False) as f:
+        try:
+            _write_captions(f, obj)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    if os.path.exists(path):
+        shutil.copymode(path, f.name)  # keep the permissions of a rewritten file
+    os.replace(f.name, path)
+
+
+def _write_captions(f, obj: dict):
+    f.write(b"{\n")
+    for n, (key, value) in enumerate(obj.items()):
+        f.write(b"  " + dumps(key, indent=False) + b": ")
+        if key == "captions" and value:
+            f.write(b"[\n")
+            last = len(value) - 1
+            for i, caption in enumerate(value):
+                f.write(b"    " + dumps(caption, indent=False))
+                f.write(b",\n" if i < last else b"\n")
+            f.write(b"  ]")
+        else:
+            f.write(dumps(value, indent=False))
+        f.write(b",\n" if n < len(obj) - 1 else b"\n")
+    f.write(b"}\n")
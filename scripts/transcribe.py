@@ -4,23 +4,65 @@ transcribe.py - Transcribe audio to Hinglish using oriserve/whisper-hindi2hingli
 
 Uses the HuggingFace transformers pipeline for ASR.
 Since this model produces compressed timestamps, we use the actual
-audio duration (via ffprobe) to distribute word timings accurately.
+audio duration (from the decoded samples, or PyAV/ffprobe as a fallback) to
+distribute word timings accurately.
 
 Usage:
     python transcribe.py audio.wav --output captions.json
     python transcribe.py audio.wav --model oriserve/whisper-hindi2hinglish-apex --output captions.json
+    python transcribe.py part1.wav part2.wav  # writes part1.captions.json, part2.captions.json
 """
 
 import argparse
-import json
+import gc
 import subprocess
 import sys
 import time
 from pathlib import Path
 
+import numpy as np
+
+from jsonio import write_json
+
+# The transformers pipeline does not expose per-word probabilities, so every
+# word gets this placeholder and the output is marked "word_confidence": false
+# so downstream tools know not to select words by confidence.
+DEFAULT_CONFIDENCE = 0.9
+
+
+def load_audio(audio_path: str):
+    """Decode audio once into a mono float32 array.
+
+    Returns (samples, sampling_rate), or (None, 0) if soundfile is missing or
+    cannot read the file; the pipeline then decodes the path itself.
+    """
+    try:
+        import soundfile as sf
+        samples, sampling_rate = sf.read(audio_path, dtype="float32", always_2d=False)
+    except Exception as e:
+        print(f"Warning: could not preload audio ({e}), falling back to pipeline decoding")
+        return None, 0
+
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    return samples, sampling_rate
+
 
 def get_audio_duration_ms(audio_path: str) -> int:
-    """Get audio duration in milliseconds using ffprobe."""
+    """Get audio duration in milliseconds via PyAV, falling back to ffprobe."""
+    try:
+        import av
+    except ImportError:
+        av = None
+
+    if av is not None:
+        try:
+            with av.open(audio_path) as container:
+                if container.duration is not None:
+                    return int(container.duration / av.time_base * 1000)
+        except Exception as e:
+            print(f"Warning: PyAV could not read duration ({e}), trying ffprobe")
+
     try:
         result = subprocess.run(
             [
@@ -38,51 +80,188 @@ def get_audio_duration_ms(audio_path: str) -> int:
         return 0
 
 
-def transcribe_audio(audio_path: str, model_name: str, output_path: str):
-    """Transcribe audio using HuggingFace transformers pipeline."""
-
-    print(f"Loading model: {model_name}")
-    print(f"Audio file: {audio_path}")
-    start_time = time.time()
-
-    # Get actual audio duration FIRST
-    audio_duration_ms = get_audio_duration_ms(audio_path)
-    if audio_duration_ms > 0:
-        print(f"Audio duration: {audio_duration_ms / 1000:.1f}s")
-
-    import torch
-    from transformers import pipeline
-
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    torch_dtype = torch.float16 if device == "cuda" else torch.float32
-
-    print(f"Device: {device}, dtype: {torch_dtype}")
-
-    # Load ASR pipeline
-    pipe = pipeline(
-        "automatic-speech-recognition",
-        model=model_name,
-        torch_dtype=torch_dtype,
-        device=device,
-    )
-
-    load_time = time.time() - start_time
-    print(f"Model loaded in {load_time:.1f}s")
-
-    # Transcribe with timestamps
-    print("Transcribing...")
-    transcribe_start = time.time()
-
-    result = pipe(
-        audio_path,
-        return_timestamps=True,
-        chunk_length_s=30,
-        batch_size=1,
-    )
+class Transcriber:
+    """ASR pipeline that is loaded once and reused across audio files.
+
+    device and compute_type default to CUDA/float16 when a GPU is available,
+    otherwise CPU/float32. Decoding is greedy unless beam_size > 1.
+    batch_size defaults to 16 on GPU and 1 on CPU, and is halved automatically
+    if CUDA runs out of memory.
+
+    Usage:
+        with Transcriber(model_name) as transcriber:
+            transcriber.transcribe("a.wav", "a.captions.json")
+            transcriber.transcribe("b.wav", "b.captions.json")
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        device: str = None,
+        compute_type: str = None,
+        beam_size: int = 1,
+        batch_size: int = None,
+    ):
+        self.model_name = model_name
+        self.device = device
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+        self.batch_size = batch_size
+        self.torch_dtype = None
+        self.pipe = None
+        self.load_time = 0.0
+
+    def __enter__(self):
+        print(f"Loading model: {self.model_name}")
+        start_time = time.time()
+
+        import torch
+        from transformers import pipeline
+
+        if self.device is None:
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        if self.compute_type is None:
+            self.compute_type = "float16" if self.device.startswith("cuda") else "float32"
+        torch_dtype = self.torch_dtype = getattr(torch, self.compute_type)
+
+        # The pipeline splits audio into 30s chunks; on GPU decode them in
+        # padded batches instead of one at a time.
+        if self.batch_size is None:
+            self.batch_size = 16 if self.device.startswith("cuda") else 1
+
+        if self.device.startswith("cuda"):
+            torch.cuda.reset_peak_memory_stats(self.device)
+            # TF32 matmuls and cuDNN autotuning (inputs are fixed 30s chunks)
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
+            torch.backends.cudnn.benchmark = True
+
+        print(f"Device: {self.device}, dtype: {torch_dtype}, batch size: {self.batch_size}, beams: {self.beam_size}")
+
+        # Load ASR pipeline
+        self.pipe = pipeline(
+            "automatic-speech-recognition",
+            model=self.model_name,
+            torch_dtype=torch_dtype,
+            device=self.device,
+        )
 
-    transcribe_time = time.time() - transcribe_start
-    print(f"Transcription complete in {transcribe_time:.1f}s")
+        self.load_time = time.time() - start_time
+        print(f"Model loaded in {self.load_time:.1f}s")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Free the model and cached CUDA blocks so later GPU work in the same
+        # process isn't starved of VRAM; runs even if transcription failed.
+        del self.pipe
+        self.pipe = None
+        gc.collect()
+
+        if self.device.startswith("cuda"):
+            import torch
+
+            peak_gb = torch.cuda.max_memory_allocated(self.device) / (1 << 30)
+            print(f"Peak VRAM: {peak_gb:.2f} GB")
+            # empty_cache/ipc_collect act on the current device
+            with torch.cuda.device(self.device):
+                torch.cuda.empty_cache()
+                torch.cuda.ipc_collect()
+        return False
+
+    def transcribe(self, audio_path: str, output_path: str) -> dict:
+        """Transcribe one audio file and write its captions JSON.
+
+        Returns None if no words were transcribed.
+        """
+        print(f"Audio file: {audio_path}")
+
+        # Decode once: the same samples give the duration and feed the pipeline,
+        # which resamples to the model's rate if needed.
+        samples, sampling_rate = load_audio(audio_path)
+        if samples is not None:
+            audio_duration_ms = int(len(samples) / sampling_rate * 1000)
+        else:
+            audio_duration_ms = get_audio_duration_ms(audio_path)
+        if audio_duration_ms > 0:
+            print(f"Audio duration: {audio_duration_ms / 1000:.1f}s")
+
+        # Transcribe with timestamps
+        print("Transcribing...")
+        transcribe_start = time.time()
+
+        result = self._run_pipeline(audio_path, samples, sampling_rate)
+
+        transcribe_time = time.time() - transcribe_start
+        print(f"Transcription complete in {transcribe_time:.1f}s")
+
+        return _build_output(
+            result,
+            audio_duration_ms,
+            self.model_name,
+            output_path,
+            load_time=self.load_time,
+            transcribe_time=transcribe_time,
+        )
 
+    def _run_pipeline(self, audio_path: str, samples, sampling_rate: int) -> dict:
+        """Run the pipeline, halving the batch size on CUDA out-of-memory."""
+        import torch
+
+        use_autocast = self.device.startswith("cuda") and self.torch_dtype != torch.float32
+
+        while True:
+            # The pipeline consumes its input dict, so build a fresh one per attempt
+            if samples is not None:
+                audio_input = {"raw": samples, "sampling_rate": sampling_rate}
+            else:
+                audio_input = audio_path
+
+            try:
+                with torch.inference_mode(), torch.autocast(
+                    "cuda", dtype=self.torch_dtype, enabled=use_autocast
+                ):
+                    return self.pipe(
+                        audio_input,
+                        return_timestamps=True,
+                        chunk_length_s=30,
+                        batch_size=self.batch_size,
+                        generate_kwargs={"num_beams": self.beam_size},
+                    )
+            except torch.cuda.OutOfMemoryError:
+                if self.batch_size <= 1:
+                    raise
+                self.batch_size //= 2
+                gc.collect()
+                torch.cuda.empty_cache()
+                print(f"CUDA out of memory, retrying with batch size {self.batch_size}")
+
+
+def transcribe_audio(
+    audio_path: str,
+    model_name: str,
+    output_path: str,
+    device: str = None,
+    compute_type: str = None,
+    beam_size: int = 1,
+    batch_size: int = None,
+):
+    """Transcribe a single audio file using HuggingFace transformers pipeline."""
+    with Transcriber(model_name, device, compute_type, beam_size, batch_size) as transcriber:
+        return transcriber.transcribe(audio_path, output_path)
+
+
+def _build_output(
+    result: dict,
+    audio_duration_ms: int,
+    model_name: str,
+    output_path: str,
+    load_time: float,
+    transcribe_time: float,
+) -> dict:
+    """Distribute pipeline words over the audio duration and save captions.
+
+    Returns None, writing nothing, if no words were transcribed.
+    """
     # Collect all words from chunks
     all_words = []
     if "chunks" in result:
@@ -100,7 +279,7 @@ def transcribe_audio(audio_path: str, model_name: str, output_path: str):
 
     if not all_words:
         print("ERROR: No words transcribed!")
-        sys.exit(1)
+        return None
 
     # Use actual audio duration to distribute words evenly
     if audio_duration_ms <= 0:
@@ -113,16 +292,19 @@ def transcribe_audio(audio_path: str, model_name: str, output_path: str):
     usable_duration = audio_duration_ms - start_offset_ms - end_buffer_ms
     word_duration_ms = usable_duration / len(all_words)
 
-    captions = []
-    for i, word in enumerate(all_words):
-        s = int(start_offset_ms + i * word_duration_ms)
-        e = int(start_offset_ms + (i + 1) * word_duration_ms)
-        captions.append({
+    # Word i spans [boundaries[i], boundaries[i + 1])
+    boundaries = (
+        start_offset_ms + np.arange(len(all_words) + 1) * word_duration_ms
+    ).astype(np.int64).tolist()
+    captions = [
+        {
             "text": word,
             "startMs": s,
             "endMs": e,
-            "confidence": 0.9,
-        })
+            "confidence": DEFAULT_CONFIDENCE,
+        }
+        for word, s, e in zip(all_words, boundaries, boundaries[1:])
+    ]
 
     print(f"Distributed {len(captions)} words across {audio_duration_ms / 1000:.1f}s (~{word_duration_ms:.0f}ms/word)")
 
@@ -132,6 +314,7 @@ def transcribe_audio(audio_path: str, model_name: str, output_path: str):
         "text": full_text,
         "language": "hi",
         "model": model_name,
+        "word_confidence": False,
         "captions": captions,
         "stats": {
             "total_words": len(captions),
@@ -144,10 +327,7 @@ def transcribe_audio(audio_path: str, model_name: str, output_path: str):
     }
 
     # Save output
-    Path(output_path).write_text(
-        json.dumps(output, indent=2, ensure_ascii=False),
-        encoding="utf-8",
-    )
+    write_json(output_path, output)
 
     print(f"\nResults:")
     print(f"  Words: {len(captions)}")
@@ -162,7 +342,7 @@ def transcribe_audio(audio_path: str, model_name: str, output_path: str):
 
 def main():
     parser = argparse.ArgumentParser(description="Transcribe audio to Hinglish")
-    parser.add_argument("audio", help="Path to audio file (WAV/MP3)")
+    parser.add_argument("audio", nargs="+", help="Path(s) to audio files (WAV/MP3)")
     parser.add_argument(
         "--model",
         default="oriserve/whisper-hindi2hinglish-apex",
@@ -171,16 +351,71 @@ def main():
     parser.add_argument(
         "--output",
         default="captions.json",
-        help="Output JSON file path (default: captions.json)",
+        help="Output JSON file path for a single input (default: captions.json); "
+             "with several inputs each is saved as <audio>.captions.json",
+    )
+    parser.add_argument(
+        "--device",
+        default=None,
+        help="Torch device, e.g. cuda, cuda:1, cpu (default: cuda if available)",
+    )
+    parser.add_argument(
+        "--compute-type",
+        choices=["float16", "bfloat16", "float32"],
+        default=None,
+        help="Model dtype (default: float16 on GPU, float32 on CPU)",
+    )
+    parser.add_argument(
+        "--beam-size",
+        type=int,
+        default=None,
+        help="Decoder beam size (default: 1, or 5 with --quality)",
+    )
+    parser.add_argument(
+        "--quality",
+        action="store_true",
+        help="Use beam search (beam size 5) for quality-critical transcripts",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="30s chunks decoded per batch (default: 16 on GPU, 1 on CPU)",
     )
 
     args = parser.parse_args()
 
-    if not Path(args.audio).exists():
-        print(f"Error: Audio file not found: {args.audio}")
-        sys.exit(1)
+    for audio in args.audio:
+        if not Path(audio).exists():
+            print(f"Error: Audio file not found: {audio}")
+            sys.exit(1)
 
-    transcribe_audio(args.audio, args.model, args.output)
+    if len(args.audio) == 1:
+        output_paths = [args.output]
+    else:
+        output_paths = [str(Path(audio).with_suffix(".captions.json")) for audio in args.audio]
+        # e.g. clip.wav and clip.mp3 would overwrite each other's captions
+        seen = {}
+        for audio, output_path in zip(args.audio, output_paths):
+            if output_path in seen:
+                print(f"Error: {seen[output_path]} and {audio} would both be saved as {output_path}")
+                sys.exit(1)
+            seen[output_path] = audio
+
+    beam_size = args.beam_size or (5 if args.quality else 1)
+
+    # Load the model once and reuse it for every input file
+    with Transcriber(
+        args.model, args.device, args.compute_type, beam_size, args.batch_size
+    ) as transcriber:
+        failed = []
+        for audio, output_path in zip(args.audio, output_paths):
+            if transcriber.transcribe(audio, output_path) is None:
+                failed.append(audio)
+
+    if failed:
+        print(f"ERROR: No captions for {len(failed)}/{len(args.audio)} files: {', '.join(failed)}")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
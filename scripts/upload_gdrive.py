@@ -7,136 +7,954 @@ without needing Google API Python packages or service account JSON.
 
 Usage:
     python upload_gdrive.py output.mp4 FOLDER_ID
+    python upload_gdrive.py part1.mp4 part2.mp4 FOLDER_ID
 
 Environment:
-    RCLONE_CONFIG: Base64-encoded rclone config (for GitHub Actions)
+    RCLONE_CONFIG_B64: Base64-encoded rclone config (for GitHub Actions)
     RCLONE_REMOTE: Remote name (default: "gdrive")
+    RCLONE_TRANSFERS: Parallel transfers for multi-file uploads (default: 4)
+    RCLONE_CHUNK_MB: Drive upload chunk size in MiB (default: 64)
+    CONTENT_HASH_NAMES: If set, name uploads captioned_<stem>_<md5[:12]>.mp4
+        instead of using a timestamp, and skip files already in the folder
+    DRIVE_MOUNT_PREFIX: Path where a Drive remote is mounted (e.g. /mnt/gdrive/);
+        files under it are copied server-side instead of uploaded
+    DRIVE_MOUNT_REMOTE: Remote mounted at DRIVE_MOUNT_PREFIX (default: RCLONE_REMOTE)
+    USE_RCLONE_DAEMON: If set, upload single files through a long-lived
+        `rclone rcd` on a unix socket (started on first use and left running)
+    USE_LIBRCLONE: If set, upload through librclone loaded in-process with
+        ctypes (path from LIBRCLONE_PATH), falling back to the rclone CLI
+    USE_RCLONE_EXEC: If set, replace this process with rclone for single-file
+        uploads; its result line is left as "pending" and the exit code is
+        rclone's, so the caller finalizes the result
+
+Results are appended to gdrive_results.jsonl, one JSON object per file,
+for the n8n callback to tail.
 """
 
 import os
 import sys
+import atexit
 import base64
+import configparser
+import ctypes
+import hashlib
+import http.client
+import json
+import mmap
+import shlex
+import shutil
+import socket
+import stat
 import subprocess
 import tempfile
-from datetime import datetime
+import time
+from collections import deque
 from pathlib import Path
 
+from jsonio import dumps
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+RESULTS_FILE = "gdrive_results.jsonl"
+
+
+def _append_results(records: list):
+    """Append records to RESULTS_FILE as NDJSON for the n8n callback.
+
+    The file is locked for the write so concurrent uploads don't interleave
+    their lines.
+    """
+    data = b"".join(dumps(record, indent=False) + b"\n" for record in records)
+    with open(RESULTS_FILE, "ab") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.write(data)
+            f.flush()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
 
-def setup_rclone_config():
-    """Setup rclone config from environment variable (for CI/CD)."""
+
+def setup_rclone_config() -> list:
+    """Setup rclone config and return the configured remote names.
+
+    In CI the base64 config is exported as RCLONE_CONFIG_<REMOTE>_<KEY>
+    environment variables, which rclone reads natively, so nothing is
+    written to disk. Configs that can't be parsed here (e.g. encrypted ones)
+    are written out or used as they are, and no remote names are returned.
+    """
+    # rclone itself accepts repeated keys, last one wins
+    config = configparser.ConfigParser(interpolation=None, strict=False)
+    
     config_b64 = os.environ.get("RCLONE_CONFIG_B64", "")
     if config_b64:
-        config_dir = Path.home() / ".config" / "rclone"
-        config_dir.mkdir(parents=True, exist_ok=True)
-        config_path = config_dir / "rclone.conf"
-        config_path.write_bytes(base64.b64decode(config_b64))
-        print(f"✅ rclone config written to {config_path}")
-        return str(config_path)
+        config_bytes = base64.b64decode(config_b64)
+        try:
+            config.read_string(config_bytes.decode("utf-8"))
+        except (configparser.Error, UnicodeDecodeError):
+            config_dir = Path.home() / ".config" / "rclone"
+            config_dir.mkdir(parents=True, exist_ok=True)
+            config_path = config_dir / "rclone.conf"
+            config_path.write_bytes(config_bytes)
+            print(f"✅ rclone config written to {config_path}")
+            return []
+        for remote in config.sections():
+            for key, value in config[remote].items():
+                env_name = f"RCLONE_CONFIG_{remote}_{key}".upper().replace("-", "_")
+                os.environ[env_name] = value
+        print(f"✅ rclone config loaded from environment ({len(config.sections())} remotes)")
+        return config.sections()
     
     # Check if rclone config already exists (local dev)
     default_config = Path.home() / ".config" / "rclone" / "rclone.conf"
     if default_config.exists():
         print(f"✅ Using existing rclone config: {default_config}")
-        return str(default_config)
+        try:
+            config.read(default_config, encoding="utf-8")
+        except (configparser.Error, UnicodeDecodeError):
+            return []
+        return config.sections()
     
     print("❌ No rclone config found. Set RCLONE_CONFIG_B64 env or run: rclone config")
     sys.exit(1)
 
 
-def upload_to_drive(file_path: str, folder_id: str):
-    """Upload a file to Google Drive folder using rclone."""
+def _run(cmd: list, stderr=None):
+    """Run cmd to completion. Returns (returncode, stdout text)."""
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=stderr)
+    return result.returncode, result.stdout.decode("utf-8", "replace")
+
+
+def run_streaming(cmd: list, tail_lines: int = 200, on_line=None):
+    """Run cmd, echoing its output live. Returns (returncode, last output text).
+
+    Output is passed through as raw bytes; only JSON log lines are decoded,
+    for on_line if given, and the tail is decoded once at the end.
+    """
+    tail = deque(maxlen=tail_lines)
+    sys.stdout.flush()
+    out = sys.stdout.buffer
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    with proc.stdout:
+        for line in proc.stdout:
+            out.write(line)
+            out.flush()
+            tail.append(line)
+            if on_line is not None and line.startswith(b"{"):
+                on_line(line.decode("utf-8", "replace"))
+    proc.wait()
+    return proc.returncode, b"".join(tail).decode("utf-8", "replace")
+
+
+# Files up to this size are sent in a single request; larger files use a
+# resumable upload in --drive-chunk-size pieces.
+LARGE_FILE_CUTOFF = "256M"
+
+# Per-transfer read-ahead buffer, allocated with mmap outside the Go heap
+BUFFER_SIZE = "64M"
+
+
+def _tuning_flags() -> list:
+    """rclone flags that cut Drive round trips for large media files."""
+    chunk_size = os.environ.get("RCLONE_CHUNK_MB", "64") + "M"
+    return [
+        "--drive-chunk-size", chunk_size,
+        "--drive-upload-cutoff", LARGE_FILE_CUTOFF,
+        "--use-mmap",
+        "--buffer-size", BUFFER_SIZE,
+    ]
+
+
+VERSION_CACHE = Path.home() / ".cache" / "capion" / "rclone_version"
+
+
+def get_rclone_version() -> str:
+    """Return rclone's version line, cached until the binary changes.
+
+    The cache holds "<binary mtime>:<version line>". Exits if rclone is not
+    installed.
+    """
+    rclone_path = shutil.which("rclone")
+    if rclone_path is None:
+        print("❌ rclone not installed. Install: https://rclone.org/install/")
+        sys.exit(1)
+    
+    mtime = str(os.path.getmtime(rclone_path))
+    try:
+        cached_mtime, version_line = VERSION_CACHE.read_text(encoding="utf-8").split(":", 1)
+        if cached_mtime == mtime:
+            return version_line.strip()
+    except (OSError, ValueError):
+        pass
+    
+    returncode, output = _run([rclone_path, "version"], stderr=subprocess.DEVNULL)
+    if returncode != 0:
+        return "unknown"
+    
+    version_line = output.split("\n")[0]
+    try:
+        VERSION_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        VERSION_CACHE.write_text(f"{mtime}:{version_line}\n", encoding="utf-8")
+    except OSError:
+        pass
+    return version_line
+
+
+# The daemon runs with --rc-no-auth, so its socket lives in a directory
+# only this user can reach
+RC_SOCKET = os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or os.path.join(Path.home(), ".cache", "capion"),
+    "rclone.sock",
+)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a unix socket, for the rclone rc daemon."""
+
+    def __init__(self, socket_path: str, timeout: float = 60):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def rc_call(method: str, params: dict = None, socket_path: str = RC_SOCKET) -> dict:
+    """Call an rclone remote-control method on the daemon socket."""
+    conn = _UnixHTTPConnection(socket_path)
+    try:
+        conn.request(
+            "POST",
+            f"/{method}",
+            body=json.dumps(params or {}),
+            headers={"Content-Type": "application/json"},
+        )
+        response = conn.getresponse()
+        body = json.loads(response.read() or b"{}")
+    except (http.client.HTTPException, ValueError) as e:
+        raise RuntimeError(f"bad reply from {socket_path}: {e}") from e
+    finally:
+        conn.close()
+    
+    if response.status != 200:
+        raise RuntimeError(body.get("error", f"HTTP {response.status}"))
+    return body
+
+
+def ensure_rclone_daemon(socket_path: str = RC_SOCKET, timeout: float = 15.0):
+    """Start `rclone rcd` on socket_path unless a daemon already answers there.
+
+    The daemon is detached and outlives this process, so later uploads reuse
+    its parsed config, OAuth token and warm Drive connections.
+    """
+    try:
+        rc_call("rc/noop", socket_path=socket_path)
+        return
+    except OSError:
+        pass
+    
+    os.makedirs(os.path.dirname(socket_path), mode=0o700, exist_ok=True)
+    if os.path.exists(socket_path):
+        if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+            raise RuntimeError(f"{socket_path} exists and is not a socket")
+        os.unlink(socket_path)  # stale socket from a dead daemon
+    
+    print(f"🚀 Starting rclone daemon on {socket_path}")
+    subprocess.Popen(
+        ["rclone", "rcd", "--rc-addr", f"unix://{socket_path}", "--rc-no-auth"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            rc_call("rc/noop", socket_path=socket_path)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"rclone daemon did not come up on {socket_path}")
+
+
+class _RcloneRPCResult(ctypes.Structure):
+    _fields_ = [("Output", ctypes.c_void_p), ("Status", ctypes.c_int)]
+
+
+class LibRclone:
+    """rclone's C API (librclone) loaded in-process with ctypes.
+
+    rpc() takes the same arguments as rc_call, so uploads can use either
+    without starting any rclone processes.
+    """
+
+    def __init__(self, path: str = "librclone.so"):
+        self.lib = ctypes.CDLL(path)
+        self.lib.RcloneRPC.argtypes = [ctypes.c_char_p, ctypes.c_char_p]
+        self.lib.RcloneRPC.restype = _RcloneRPCResult
+        self.lib.RcloneFreeString.argtypes = [ctypes.c_void_p]
+        self.lib.RcloneInitialize()
+        atexit.register(self.lib.RcloneFinalize)
+
+    def rpc(self, method: str, params: dict = None) -> dict:
+        
+        result = self.lib.RcloneRPC(method.encode("utf-8"), json.dumps(params or {}).encode("utf-8"))
+        try:
+            output = ctypes.string_at(result.Output).decode("utf-8") if result.Output else ""
+        finally:
+            self.lib.RcloneFreeString(result.Output)
+        body = json.loads(output or "{}")
+        
+        if result.Status != 200:
+            raise RuntimeError(body.get("error", f"status {result.Status}"))
+        return body
+
+
+_LIBRCLONE = None
+
+
+def get_librclone():
+    """Load librclone once per process. Returns None if it can't be loaded.
+
+    The library path comes from LIBRCLONE_PATH (default: librclone.so on the
+    loader path).
+    """
+    global _LIBRCLONE
+    if _LIBRCLONE is None:
+        path = os.environ.get("LIBRCLONE_PATH", "librclone.so")
+        try:
+            _LIBRCLONE = LibRclone(path)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️  Could not load librclone ({e}), using the rclone CLI")
+            return None
+    return _LIBRCLONE
+
+
+ABOUT_CACHE = "/tmp/rclone_about.json"
+ABOUT_MAX_AGE = 60  # seconds
+
+
+def get_remote_about(remote_name: str) -> dict:
+    """Return `rclone about --json` for the remote, cached for ABOUT_MAX_AGE.
+
+    Returns an empty dict if the remote cannot report its quota.
+    """
+    try:
+        cache = json.loads(Path(ABOUT_CACHE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        cache = {}
+    entry = cache.get(remote_name)
+    if entry and time.time() - entry["checked"] < ABOUT_MAX_AGE:
+        return entry["about"]
+    
+    returncode, output = _run(
+        ["rclone", "about", "--json", f"{remote_name}:"],
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        about = json.loads(output) if returncode == 0 else {}
+    except ValueError:
+        about = {}
+    
+    cache[remote_name] = {"checked": time.time(), "about": about}
+    try:
+        Path(ABOUT_CACHE).write_text(json.dumps(cache), encoding="utf-8")
+    except OSError:
+        pass
+    return about
+
+
+# Uploads that were started but not confirmed, so a rerun can retry them
+# under the same destination name instead of creating a duplicate.
+RESUME_STATE = "resume.json"
+RESUME_FLAGS = [
+    "--drive-stop-on-upload-limit",
+    "--retries", "10",
+    "--low-level-retries", "20",
+]
+
+
+def _resume_key(file_path: str) -> str:
+    path_hash = hashlib.sha1(os.path.abspath(file_path).encode("utf-8")).hexdigest()[:16]
+    return f"{path_hash}:{os.path.getsize(file_path)}"
+
+
+def _load_resume_state() -> dict:
+    try:
+        return json.loads(Path(RESUME_STATE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_resume_state(state: dict):
+    if state:
+        Path(RESUME_STATE).write_text(json.dumps(state, indent=2), encoding="utf-8")
+    elif os.path.exists(RESUME_STATE):
+        os.remove(RESUME_STATE)
+
+
+def upload_to_drive(paths, folder_id: str, concurrency: int = 4):
+    """Upload one or more files to a Google Drive folder using rclone.
+
+    Files are staged under their upload names and sent with a single
+    rclone copy using parallel transfers.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
     
     # Setup config first
-    config_path = setup_rclone_config()
+    remotes = setup_rclone_config()
     
     # Auto-detect remote name from config if not explicitly set
     remote_name = os.environ.get("RCLONE_REMOTE", "")
     if not remote_name:
-        import re
-        config_text = Path(config_path).read_text(encoding="utf-8", errors="ignore")
-        sections = re.findall(r'^\[(.+?)\]', config_text, re.MULTILINE)
-        if sections:
-            remote_name = sections[0]
+        if remotes:
+            remote_name = remotes[0]
             print(f"Auto-detected rclone remote: '{remote_name}'")
         else:
-            print("No remotes found in rclone config!")
+            print("No remotes found in rclone config! Set RCLONE_REMOTE for encrypted configs.")
             sys.exit(1)
     
     # Verify rclone is installed
-    try:
-        result = subprocess.run(["rclone", "version"], capture_output=True, text=True)
-        version_line = result.stdout.split("\n")[0] if result.returncode == 0 else "unknown"
-        print(f"📦 rclone version: {version_line}")
-    except FileNotFoundError:
-        print("❌ rclone not installed. Install: https://rclone.org/install/")
-        sys.exit(1)
+    print(f"📦 rclone version: {get_rclone_version()}")
     
-    # Generate timestamped filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    original_name = Path(file_path).stem
-    upload_name = f"captioned_{original_name}_{timestamp}.mp4"
+    # Generate timestamped (UTC) or content-hash filenames, reusing the name
+    # of any unfinished upload of the same file from a previous run
+    timestamp = time.strftime("%Y%m%d_%H%M%S", time.gmtime())
+    content_names = bool(os.environ.get("CONTENT_HASH_NAMES"))
+    # Hashed once here and reused for checksum verification
+    digests = {p: _md5(p) for p in paths} if content_names else {}
+    resume_state = _load_resume_state()
+    resuming = False
+    upload_names = []
+    for file_path in paths:
+        key = _resume_key(file_path)
+        entry = resume_state.get(key)
+        mtime = os.path.getmtime(file_path)
+        if entry and entry["mtime"] == mtime and entry["folder_id"] == folder_id:
+            upload_name = entry["upload_name"]
+            resuming = True
+            print(f"🔁 Retrying unfinished upload as '{upload_name}'")
+        else:
+            original_name = os.path.splitext(os.path.basename(file_path))[0]
+            if content_names:
+                upload_name = f"captioned_{original_name}_{digests[file_path][:12]}.mp4"
+            else:
+                upload_name = f"captioned_{original_name}_{timestamp}.mp4"
+                if upload_name in upload_names:
+                    upload_name = f"captioned_{original_name}_{timestamp}_{len(upload_names)}.mp4"
+        upload_names.append(upload_name)
+        resume_state[key] = {
+            "file_path": os.path.abspath(file_path),
+            "size": os.path.getsize(file_path),
+            "mtime": mtime,
+            "folder_id": folder_id,
+            "upload_name": upload_name,
+        }
+    _save_resume_state(resume_state)
     
-    # rclone destination: remote:path
-    # Use --drive-root-folder-id to target specific folder
-    destination = f"{remote_name}:{upload_name}"
+    # Content-named files already in the folder don't need uploading again
+    existing = {}
+    if content_names:
+        existing = _find_existing(upload_names, [digests[p] for p in paths], remote_name, folder_id)
+    pending_paths = []
+    pending_names = []
+    for file_path, upload_name in zip(paths, upload_names):
+        if upload_name in existing:
+            print(f"⏭️  {os.path.basename(file_path)} is already in Drive as '{existing[upload_name]}'")
+        else:
+            pending_paths.append(file_path)
+            pending_names.append(upload_name)
+    
+    # Files on a Drive mount are copied server-side, without passing
+    # through the runner; if that fails they are uploaded from the mount
+    server_side = set()
+    for file_path, upload_name in zip(pending_paths, pending_names):
+        source = _mount_source(file_path, remote_name)
+        if source is not None and _copy_server_side(source, upload_name, remote_name, folder_id):
+            server_side.add(upload_name)
+    if server_side:
+        pending = [(p, n) for p, n in zip(pending_paths, pending_names) if n not in server_side]
+        pending_paths = [p for p, _ in pending]
+        pending_names = [n for _, n in pending]
+    
+    # Don't start uploads that would run out of Drive quota part way; they
+    # are recorded as failed and the script exits 3
+    no_space = False
+    if pending_paths:
+        free = get_remote_about(remote_name).get("free")
+        total_size = sum(os.path.getsize(p) for p in pending_paths)
+        if free is not None and total_size > free:
+            print(f"❌ Not enough Drive space: need {total_size / 1e6:.1f} MB, {free / 1e6:.1f} MB free")
+            no_space = True
+    
+    extra_flags = RESUME_FLAGS if resuming else []
+    if len(paths) == 1 and pending_paths and not no_space and os.environ.get("USE_RCLONE_EXEC"):
+        # Nothing runs after exec, so the resume entry can't be cleared later,
+        # and no other file may still need its result recorded
+        resume_state.pop(_resume_key(pending_paths[0]), None)
+        _save_resume_state(resume_state)
+        _exec_copy(pending_paths[0], pending_names[0], remote_name, folder_id, extra_flags)
+    
+    librclone = get_librclone() if pending_paths and os.environ.get("USE_LIBRCLONE") else None
+    if not pending_paths or no_space:
+        copied = set()
+    elif librclone is not None:
+        copied = _copy_via_rc(librclone.rpc, "librclone", pending_paths, pending_names, remote_name, folder_id)
+    elif len(pending_paths) == 1 and os.environ.get("USE_RCLONE_DAEMON"):
+        copied = _copy_via_rc(
+            rc_call, "rc daemon", pending_paths, pending_names, remote_name, folder_id,
+            start=ensure_rclone_daemon,
+        )
+    else:
+        copied = _copy_staged(pending_paths, pending_names, remote_name, folder_id, concurrency, extra_flags)
+    
+    corrupted = []
+    if copied:
+        corrupted = _verify_uploads(pending_paths, pending_names, copied, remote_name, folder_id, digests)
+        copied -= set(corrupted)
+    
+    failed = [name for name in pending_names if name not in copied]
+    
+    for file_path, upload_name in zip(paths, upload_names):
+        if upload_name in copied or upload_name in server_side or upload_name in existing:
+            resume_state.pop(_resume_key(file_path), None)
+    _save_resume_state(resume_state)
     
-    print(f"☁️  Uploading '{upload_name}' to Google Drive folder {folder_id}...")
+    # Record results for n8n callback
+    _append_results([
+        {
+            "source": file_path,
+            "fileName": existing.get(name, name),
+            "folderId": folder_id,
+            "status": "failed" if name in failed else "success",
+        }
+        for file_path, name in zip(paths, upload_names)
+    ])
     
+    if failed:
+        print(f"\n❌ {len(failed)}/{len(paths)} uploads failed: {', '.join(failed)}")
+        # Corrupted uploads were deleted; their resume entries are kept so a
+        # rerun retries the same names
+        sys.exit(3 if no_space else 2 if corrupted else 1)
+
+
+def _mount_source(file_path: str, default_remote: str):
+    """Return the "remote:path" behind a file on a Drive mount, or None.
+
+    DRIVE_MOUNT_PREFIX is where DRIVE_MOUNT_REMOTE (default: the upload
+    remote) is mounted, e.g. /mnt/gdrive/.
+    """
+    prefix = os.environ.get("DRIVE_MOUNT_PREFIX")
+    if not prefix:
+        return None
+    prefix = os.path.join(os.path.abspath(prefix), "")
+    source = os.path.abspath(file_path)
+    if not source.startswith(prefix):
+        return None
+    remote = os.environ.get("DRIVE_MOUNT_REMOTE", default_remote)
+    return f"{remote}:{source[len(prefix):]}"
+
+
+def _copy_server_side(source: str, upload_name: str, remote_name: str, folder_id: str) -> bool:
+    """Copy a file that already lives in Drive without downloading it. Returns True on success."""
+    # The folder goes in the connection string so --drive-root-folder-id
+    # doesn't also re-root the source remote
+    destination = f"{remote_name},root_folder_id={folder_id}:{upload_name}"
     cmd = [
+        "rclone", "copyto",
+        source,
+        destination,
+        "--drive-server-side-across-configs",
+        "--stats-one-line",
+        "-v",
+    ]
+    
+    print(f"☁️  Copying '{source}' to '{upload_name}' server-side...")
+    print(f"   Command: {shlex.join(cmd)}")
+    
+    returncode, tail = run_streaming(cmd)
+    if returncode != 0:
+        print(f"⚠️  Server-side copy failed, uploading from the mount instead")
+        return False
+    
+    print(f"✅ Copied server-side: {upload_name}")
+    return True
+
+
+def _find_existing(upload_names: list, digests: list, remote_name: str, folder_id: str) -> dict:
+    """Map content-hash upload names to files already in the Drive folder.
+
+    Files match on the "_<md5[:12]>.mp4" suffix, so a copy uploaded from a
+    differently named source still counts. Names that don't carry their
+    file's hash (e.g. a resumed timestamped name) are never matched.
+    """
+    suffixes = {}
+    for upload_name, digest in zip(upload_names, digests):
+        suffix = f"_{digest[:12]}.mp4"
+        if upload_name.endswith(suffix):
+            suffixes.setdefault(suffix, []).append(upload_name)
+    if not suffixes:
+        return {}
+    
+    cmd = [
+        "rclone", "lsf",
+        f"{remote_name}:",
+        "--drive-root-folder-id", folder_id,
+        "--format", "p",
+        "--files-only",
+    ]
+    for suffix in suffixes:
+        cmd += ["--include", f"*{suffix}"]
+    
+    returncode, output = _run(cmd)
+    if returncode != 0:
+        print("⚠️  Could not list folder for existing uploads")
+        return {}
+    
+    existing = {}
+    for remote_file in output.splitlines():
+        for suffix, names in suffixes.items():
+            if remote_file.endswith(suffix):
+                for upload_name in names:
+                    existing.setdefault(upload_name, remote_file)
+    return existing
+
+
+def _md5(path: str) -> str:
+    """MD5 hex digest of a file, read in bounded chunks."""
+    with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(f, "md5").hexdigest()
+        digest = hashlib.md5()
+        if os.fstat(f.fileno()).st_size == 0:
+            return digest.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            for offset in range(0, len(view), 1 << 20):
+                digest.update(view[offset:offset + (1 << 20)])
+            view.release()
+        return digest.hexdigest()
+
+
+def _glob_escape(name: str) -> str:
+    """Escape a file name for use as an rclone filter pattern."""
+    return "".join("\\" + c if c in "\\*?[]{}" else c for c in name)
+
+
+def _verify_uploads(
+    paths: list,
+    upload_names: list,
+    copied: set,
+    remote_name: str,
+    folder_id: str,
+    digests: dict = None,
+) -> list:
+    """Compare Drive's MD5 of each uploaded file with the local file.
+
+    Uploads whose Drive MD5 differs are deleted from Drive and returned, so
+    the caller can record them as failed. Files missing from the listing,
+    or listed more than once, are only reported as unverified. digests maps
+    file paths to MD5s already computed.
+    """
+    digests = digests or {}
+    checked = [(p, n) for p, n in zip(paths, upload_names) if n in copied]
+    cmd = [
+        "rclone", "lsjson",
+        f"{remote_name}:",
+        "--drive-root-folder-id", folder_id,
+        "--hash",
+        "--files-only",
+    ]
+    for _, upload_name in checked:
+        cmd += ["--include", _glob_escape(upload_name)]
+    
+    returncode, output = _run(cmd)
+    if returncode != 0:
+        print("⚠️  Could not list folder for checksum verification")
+        return []
+    remote_hashes = {}
+    for entry in json.loads(output or "[]"):
+        remote_hashes.setdefault(entry["Path"], []).append((entry.get("Hashes") or {}).get("md5"))
+    
+    verified = 0
+    corrupted = []
+    for file_path, upload_name in checked:
+        local_md5 = digests.get(file_path) or _md5(file_path)
+        remote_md5s = remote_hashes.get(upload_name, [])
+        if local_md5 in remote_md5s:
+            verified += 1
+        elif len(remote_md5s) != 1 or remote_md5s[0] is None:
+            print(f"⚠️  Could not verify {upload_name}: {len(remote_md5s)} matching file(s) in Drive")
+        else:
+            print(f"❌ Checksum mismatch for {upload_name}: local {local_md5}, Drive {remote_md5s[0]}")
+            corrupted.append(upload_name)
+    
+    if verified:
+        print(f"🔒 MD5 verified for {verified} file(s)")
+    
+    for upload_name in corrupted:
+        subprocess.run([
+            "rclone", "deletefile",
+            f"{remote_name}:{upload_name}",
+            "--drive-root-folder-id", folder_id,
+        ])
+    return corrupted
+
+
+def _copyto_cmd(
+    file_path: str,
+    upload_name: str,
+    remote_name: str,
+    folder_id: str,
+    extra_flags: list = (),
+) -> list:
+    # rclone destination: remote:path
+    # Use --drive-root-folder-id to target specific folder
+    destination = f"{remote_name}:{upload_name}"
+    return [
         "rclone", "copyto",
         file_path,
         destination,
         "--drive-root-folder-id", folder_id,
+        *_tuning_flags(),
+        *extra_flags,
+        "--checksum",
         "--progress",
         "--stats-one-line",
         "-v",
     ]
+
+
+def _exec_copy(
+    file_path: str,
+    upload_name: str,
+    remote_name: str,
+    folder_id: str,
+    extra_flags: list = (),
+):
+    """Replace this process with rclone copyto after recording a pending result.
+
+    Only rclone stays resident for the upload; its exit code becomes the
+    script's exit code.
+    """
+    cmd = _copyto_cmd(file_path, upload_name, remote_name, folder_id, extra_flags)
+    _append_results([{
+        "source": file_path,
+        "fileName": upload_name,
+        "folderId": folder_id,
+        "status": "pending",
+    }])
     
-    print(f"   Command: {' '.join(cmd)}")
+    print(f"☁️  Uploading '{upload_name}' to Google Drive folder {folder_id} (exec)...")
+    print(f"   Command: {shlex.join(cmd)}")
+    sys.stdout.flush()
+    os.execvp(cmd[0], cmd)
+
+
+def _copy_via_rc(
+    rpc,
+    label: str,
+    paths: list,
+    upload_names: list,
+    remote_name: str,
+    folder_id: str,
+    start=None,
+) -> set:
+    """Upload files with operations/copyfile jobs over an rc interface.
+
+    rpc(method, params) is rc_call or LibRclone.rpc; start, if given, is
+    called first to bring the interface up. One async job is started per
+    file and all are polled together. Returns the set of uploaded names.
+    """
+    if len(paths) == 1:
+        print(f"☁️  Uploading '{upload_names[0]}' to Google Drive folder {folder_id} ({label})...")
+    else:
+        print(f"☁️  Uploading {len(paths)} files to Google Drive folder {folder_id} ({label})...")
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    chunk_size = os.environ.get("RCLONE_CHUNK_MB", "64") + "M"
+    # rc calls take no backend flags, so Drive options go in the connection string
+    destination_fs = (
+        f"{remote_name},root_folder_id={folder_id},"
+        f"chunk_size={chunk_size},upload_cutoff={LARGE_FILE_CUTOFF}:"
+    )
     
-    if result.returncode == 0:
-        print(f"\n✅ Upload successful!")
-        print(f"   📁 File: {upload_name}")
+    jobs = {}
+    statuses = {}
+    try:
+        if start is not None:
+            start()
+        for file_path, upload_name in zip(paths, upload_names):
+            source = os.path.abspath(file_path)
+            job = rpc("operations/copyfile", {
+                "srcFs": os.path.dirname(source),
+                "srcRemote": os.path.basename(source),
+                "dstFs": destination_fs,
+                "dstRemote": upload_name,
+                "_config": {"UseMmap": True, "BufferSize": BUFFER_SIZE},
+                "_async": True,
+            })
+            jobs[upload_name] = job["jobid"]
+            print(f"   rc job {job['jobid']}: operations/copyfile {upload_name}")
+        
+        while len(statuses) < len(jobs):
+            for upload_name, jobid in jobs.items():
+                if upload_name not in statuses:
+                    status = rpc("job/status", {"jobid": jobid})
+                    if status.get("finished"):
+                        statuses[upload_name] = status
+            if len(statuses) < len(jobs):
+                time.sleep(1)
+    except (OSError, RuntimeError) as e:
+        print(f"\n❌ Upload failed!")
+        print(f"   {label} error: {e}")
+        return set()
+    
+    copied = {name for name, status in statuses.items() if status.get("success")}
+    
+    if len(paths) == 1:
+        status = statuses[upload_names[0]]
+        if not copied:
+            print(f"\n❌ Upload failed!")
+            print(f"   Error: {status.get('error')}")
+            return copied
+        print(f"\n✅ Upload successful! ({status.get('duration', 0):.1f}s)")
+        print(f"   📁 File: {upload_names[0]}")
         print(f"   📂 Folder ID: {folder_id}")
+    else:
+        for upload_name in upload_names:
+            status = statuses[upload_name]
+            if upload_name in copied:
+                print(f"   ✅ {upload_name} ({status.get('duration', 0):.1f}s)")
+            else:
+                print(f"   ❌ {upload_name}: {status.get('error')}")
+    return copied
+
+
+def _staging_parent(paths: list):
+    """Directory to stage uploads in, or None for the system temp dir.
+
+    Staging beside the first input keeps the hardlinks on one filesystem.
+    That is skipped when any input is on another device or on the Drive
+    mount, which can't hardlink and would get a full copy written to Drive.
+    """
+    source_dir = os.path.dirname(os.path.abspath(paths[0]))
+    source_dev = os.stat(source_dir).st_dev
+    for file_path in paths:
+        if _mount_source(file_path, "") is not None or os.stat(file_path).st_dev != source_dev:
+            return None
+    return source_dir
+
+
+def _copy_staged(
+    paths: list,
+    upload_names: list,
+    remote_name: str,
+    folder_id: str,
+    concurrency: int,
+    extra_flags: list = (),
+) -> set:
+    """Upload files with one rclone copy of a staging directory.
+
+    Inputs are hardlinked (or copied, across filesystems) into a temporary
+    directory under their upload names, so a single copy with --fast-list
+    replaces per-file copyto calls. Returns the set of uploaded names.
+    """
+    if len(paths) == 1:
+        print(f"☁️  Uploading '{upload_names[0]}' to Google Drive folder {folder_id}...")
+    else:
+        print(f"☁️  Uploading {len(paths)} files to Google Drive folder {folder_id} ({concurrency} parallel transfers)...")
+    
+    copied = set()
+    
+    def collect(line: str):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return
+        if str(entry.get("msg", "")).startswith("Copied") and entry.get("object"):
+            copied.add(entry["object"])
+    
+    try:
+        staging = tempfile.TemporaryDirectory(prefix=".rclone-staging-", dir=_staging_parent(paths))
+    except OSError:
+        staging = tempfile.TemporaryDirectory()
+    
+    with staging as staging_dir:
+        for file_path, upload_name in zip(paths, upload_names):
+            staged = os.path.join(staging_dir, upload_name)
+            try:
+                os.link(file_path, staged)
+            except OSError:
+                shutil.copy2(file_path, staged)
         
-        if result.stdout:
-            print(f"   📊 {result.stdout.strip()}")
+        cmd = [
+            "rclone", "copy",
+            staging_dir,
+            f"{remote_name}:",
+            "--drive-root-folder-id", folder_id,
+            "--transfers", str(concurrency),
+            "--checkers", str(concurrency * 2),
+            *_tuning_flags(),
+            *extra_flags,
+            "--checksum",
+            "--fast-list",
+            "--use-json-log",
+            "--progress",
+            "--stats-one-line",
+            "-v",
+        ]
         
-        # Write result for n8n callback
-        import json
-        Path("gdrive_result.json").write_text(
-            json.dumps({
-                "fileName": upload_name,
-                "folderId": folder_id,
-                "status": "success",
-            }, indent=2),
-            encoding="utf-8"
-        )
+        print(f"   Command: {shlex.join(cmd)}")
+        
+        returncode, tail = run_streaming(cmd, on_line=collect)
+    
+    if returncode == 0:
+        copied = set(upload_names)
+    
+    if len(paths) == 1:
+        if copied:
+            print(f"\n✅ Upload successful!")
+            print(f"   📁 File: {upload_names[0]}")
+            print(f"   📂 Folder ID: {folder_id}")
+        else:
+            print(f"\n❌ Upload failed!")
     else:
-        print(f"\n❌ Upload failed!")
-        print(f"   Error: {result.stderr}")
-        sys.exit(1)
+        for upload_name in upload_names:
+            mark = "✅" if upload_name in copied else "❌"
+            print(f"   {mark} {upload_name}")
+    if returncode != 0:
+        print(f"   Last rclone output:\n{tail}")
+    
+    return copied
 
 
 def main():
     if len(sys.argv) < 3:
-        print("Usage: python upload_gdrive.py <file_path> <folder_id>")
+        print("Usage: python upload_gdrive.py <file_path> [<file_path> ...] <folder_id>")
         print("")
         print("Environment variables:")
         print("  RCLONE_CONFIG_B64  - Base64 encoded rclone.conf (for CI/CD)")
         print("  RCLONE_REMOTE      - Remote name (default: 'gdrive')")
+        print("  RCLONE_TRANSFERS   - Parallel transfers for multi-file uploads (default: 4)")
         sys.exit(1)
     
-    file_path = sys.argv[1]
-    folder_id = sys.argv[2]
+    paths = sys.argv[1:-1]
+    folder_id = sys.argv[-1]
     
-    if not Path(file_path).exists():
-        print(f"❌ File not found: {file_path}")
-        sys.exit(1)
+    for file_path in paths:
+        if not Path(file_path).exists():
+            print(f"❌ File not found: {file_path}")
+            sys.exit(1)
     
-    upload_to_drive(file_path, folder_id)
+    concurrency = int(os.environ.get("RCLONE_TRANSFERS", "4"))
+    upload_to_drive(paths, folder_id, concurrency)
 
 
 if __name__ == "__main__":